@@ -1,12 +1,45 @@
 """
 Product Store Service with UI
 """
+import hashlib
 from flask import jsonify, request, abort
 from flask import url_for  # noqa: F401 pylint: disable=unused-import
-from service.models import Product, Category
+from sqlalchemy import delete, update
+from service.models import Product, Category, DataValidationError, db
 from service.common import status  # HTTP Status Codes
 from . import app
 
+# Columns read back as rows by list_products and update_products,
+# in the same order as Product.serialize()
+PRODUCT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.available,
+    Product.category,
+)
+
+# Columns a PUT may overwrite; the primary key is never written
+WRITABLE_COLUMNS = tuple(column for column in PRODUCT_COLUMNS if column.key != "id")
+
+# Case-insensitive lookup for the ?category= query parameter
+CATEGORY_INDEX = {name.lower(): member for name, member in Category.__members__.items()}
+
+# Read endpoints that get an ETag and honor If-None-Match
+CONDITIONAL_ENDPOINTS = ("list_products", "get_products")
+
+# Keyset pagination bounds for list_products (?cursor=<id>&limit=<n>)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 200
+
+# The health check never changes, so its response is encoded once at import
+HEALTH_BODY = b'{"message":"OK","status":200}'
+HEALTH_HEADERS = [
+    ("Content-Type", "application/json"),
+    ("Content-Length", str(len(HEALTH_BODY))),
+]
+
 
 ######################################################################
 # H E A L T H   C H E C K
@@ -14,7 +47,7 @@ from . import app
 @app.route("/health")
 def healthcheck():
     """Let them know our heart is still beating"""
-    return jsonify(status=200, message="OK"), status.HTTP_200_OK
+    return HEALTH_BODY, status.HTTP_200_OK, HEALTH_HEADERS
 
 
 ######################################################################
@@ -31,23 +64,49 @@ def index():
 ######################################################################
 def check_content_type(content_type):
     """Checks that the media type is correct"""
-    if "Content-Type" not in request.headers:
-        app.logger.error("No Content-Type specified.")
-        abort(
-            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            f"Content-Type must be {content_type}",
-        )
-
-    if request.headers["Content-Type"] == content_type:
+    request_type = request.headers.get("Content-Type")
+    if request_type == content_type:
         return
 
-    app.logger.error("Invalid Content-Type: %s", request.headers["Content-Type"])
+    if request_type is None:
+        app.logger.error("No Content-Type specified.")
+    else:
+        app.logger.error("Invalid Content-Type: %s", request_type)
     abort(
         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
         f"Content-Type must be {content_type}",
     )
 
 
+def get_int_arg(name):
+    """Returns an integer query parameter, or None if it was not sent"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        app.logger.error("Invalid %s: %s", name, value)
+        return abort(status.HTTP_400_BAD_REQUEST, f"Query parameter '{name}' must be an integer")
+
+
+@app.after_request
+def add_etag(response):
+    """Tags product reads with an ETag and answers a matching If-None-Match with 304"""
+    if request.endpoint in CONDITIONAL_ENDPOINTS and response.status_code == status.HTTP_200_OK:
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+        response.make_conditional(request)
+    return response
+
+
+def serialize_row(row):
+    """Converts a projected Product row into the same dict as Product.serialize()"""
+    product = dict(row._mapping)  # pylint: disable=protected-access
+    product["price"] = str(row.price)
+    product["category"] = row.category.name
+    return product
+
+
 ######################################################################
 # C R E A T E   A   N E W   P R O D U C T
 ######################################################################
@@ -92,25 +151,45 @@ def list_products():
     name = request.args.get("name")
     category = request.args.get("category")
     available = request.args.get("available")
+    cursor = get_int_arg("cursor")
+    limit = get_int_arg("limit")
 
     if name:
         app.logger.info("Find by name: %s", name)
         products = Product.find_by_name(name)
     elif category:
         app.logger.info("Find by category: %s", category)
-        category_value = getattr(Category, category.upper())
+        category_value = CATEGORY_INDEX.get(category.lower())
+        if category_value is None:
+            abort(status.HTTP_400_BAD_REQUEST, f"Invalid category: '{category}'")
         products = Product.find_by_category(category_value)
     elif available:
         app.logger.info("Find by category: %s", available)
         products = Product.find_by_availability(available)
 
     else:
-        products = Product.all()
-
-    prod_list = []
-    for product in products:
-        prod_list.append(product.serialize())
-    return prod_list, status.HTTP_200_OK
+        products = db.session.query(Product)
+
+    # Pagination is opt-in so existing clients still receive every product
+    page_size = None
+    if cursor is not None or limit is not None:
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        elif limit < 1:
+            abort(status.HTTP_400_BAD_REQUEST, f"Query parameter 'limit' must be at least 1, got {limit}")
+        page_size = min(limit, MAX_PAGE_SIZE)
+        if cursor is not None:
+            products = products.filter(Product.id > cursor)
+        products = products.order_by(Product.id).limit(page_size)
+
+    # Fetch only the serialized columns so no Product instances are built
+    rows = products.with_entities(*PRODUCT_COLUMNS)
+    prod_list = [serialize_row(row) for row in rows]
+
+    headers = {}
+    if page_size is not None and len(prod_list) == page_size:
+        headers["X-Next-Cursor"] = str(prod_list[-1]["id"])
+    return jsonify(prod_list), status.HTTP_200_OK, headers
 
 ######################################################################
 # R E A D   A   P R O D U C T
@@ -123,10 +202,9 @@ def get_products(product_id):
     Gets a Product
     This endpoint will get a Product based the product ID passed in
     """
-    product = Product.find(product_id)
-    if not product:
-        message = f"Product with ID - '{product_id}' not found"
-        abort(status.HTTP_404_NOT_FOUND, message)
+    product = db.session.get(Product, product_id) or abort(
+        status.HTTP_404_NOT_FOUND, f"Product with ID - '{product_id}' not found"
+    )
 
     return product.serialize(), status.HTTP_200_OK
 
@@ -143,15 +221,31 @@ def update_products(product_id):
     """
     app.logger.info("Request to Update a product with id [%s]", product_id)
     check_content_type("application/json")
-    product = Product.find(product_id)
-    if not product:
-        message = f"Product with ID - '{product_id}' not found"
+
+    message = f"Product with ID - '{product_id}' not found"
+
+    # Validate the body with the model's rules, then write it in one UPDATE
+    changes = Product()
+    try:
+        changes.deserialize(request.get_json())
+    except DataValidationError:
+        # A missing product is still reported ahead of a bad body
+        if db.session.get(Product, product_id) is None:
+            abort(status.HTTP_404_NOT_FOUND, message)
+        raise
+
+    row = db.session.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values({column: getattr(changes, column.key) for column in WRITABLE_COLUMNS})
+        .returning(*PRODUCT_COLUMNS)
+    ).first()
+    if row is None:
+        db.session.rollback()
         abort(status.HTTP_404_NOT_FOUND, message)
 
-    product.deserialize(request.get_json())
-    product.id = product_id
-    product.update()
-    return product.serialize(), status.HTTP_200_OK
+    db.session.commit()
+    return serialize_row(row), status.HTTP_200_OK
 
 ######################################################################
 # D E L E T E   A   P R O D U C T
@@ -167,8 +261,8 @@ def delete_products(product_id):
     """
     app.logger.info("Request to Delete a product with id [%s]", product_id)
 
-    product = Product.find(product_id)
-    if product:
-        product.delete()
+    # Delete by primary key directly; a missing product is still a 204
+    db.session.execute(delete(Product).where(Product.id == product_id))
+    db.session.commit()
 
     return "", status.HTTP_204_NO_CONTENT
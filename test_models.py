@@ -12,7 +12,9 @@ While debugging just these tests it's convenient to use this:
 import os
 import logging
 import unittest
+from collections import Counter
 from decimal import Decimal
+from sqlalchemy import text
 from service.models import Product, Category, db, DataValidationError
 from service import app
 from tests.factories import ProductFactory
@@ -45,13 +47,24 @@ class TestProductModel(unittest.TestCase):
 
     def setUp(self):
         """This runs before each test"""
-        db.session.query(Product).delete()  # clean up the last tests
+        db.session.execute(text("TRUNCATE TABLE product RESTART IDENTITY CASCADE"))  # clean up the last tests
         db.session.commit()
 
     def tearDown(self):
         """This runs after each test"""
         db.session.remove()
 
+    ######################################################################
+    #  U T I L I T Y   F U N C T I O N S
+    ######################################################################
+    @staticmethod
+    def _bulk_create(products: list) -> None:
+        """Inserts products with one executemany batch and a single commit"""
+        for product in products:
+            product.id = None
+        db.session.bulk_save_objects(products)
+        db.session.commit()
+
     ######################################################################
     #  T E S T   C A S E S
     ######################################################################
@@ -154,10 +167,7 @@ class TestProductModel(unittest.TestCase):
         self.assertEqual(products, [])
 
         # Create 5 product objects
-        for _ in range(5):
-            product = ProductFactory()
-            product.id = None
-            product.create()
+        self._bulk_create(ProductFactory.create_batch(5))
 
         # Fetch all products from the database
         products = Product.all()
@@ -169,13 +179,9 @@ class TestProductModel(unittest.TestCase):
         self.assertEqual(products, [])
 
         # Create 5 product objects
-        name_dict = {}
-        for _ in range(5):
-            product = ProductFactory()
-            product.id = None
-            count = name_dict[product.name] if product.name in name_dict else 0
-            name_dict[product.name] = count+1
-            product.create()
+        generated_products = ProductFactory.create_batch(5)
+        name_dict = Counter(product.name for product in generated_products)
+        self._bulk_create(generated_products)
 
         # Retrieve the name of the first product in the products list
         products = Product.all()
@@ -192,14 +198,13 @@ class TestProductModel(unittest.TestCase):
 
         # Create a batch of 10 products
         products = ProductFactory.create_batch(10)
-        for product in products:
-            product.create()
+        self._bulk_create(products)
         products = Product.all()
         self.assertEqual(len(products), 10)
 
         # Retrieve availability of first product
         availability = products[0].available
-        count = len([product for product in products if product.available == availability])
+        count = Counter(product.available for product in products)[availability]
 
         # Retrieve all products with same availability
         prods = Product.find_by_availability(availability)
@@ -212,14 +217,13 @@ class TestProductModel(unittest.TestCase):
 
         # Create a batch of 10 products
         products = ProductFactory.create_batch(10)
-        for product in products:
-            product.create()
+        self._bulk_create(products)
         products = Product.all()
         self.assertEqual(len(products), 10)
 
         # Retrieve category of first product
         category = products[0].category
-        count = len([product for product in products if product.category == category])
+        count = Counter(product.category for product in products)[category]
 
         # Retrieve all products with same availability
         prods = Product.find_by_category(category)
@@ -232,14 +236,13 @@ class TestProductModel(unittest.TestCase):
 
         # Create a batch of 10 products
         products = ProductFactory.create_batch(10)
-        for product in products:
-            product.create()
+        self._bulk_create(products)
         products = Product.all()
         self.assertEqual(len(products), 10)
 
         # Retrieve price of first product
         price = products[0].price
-        count = len([product for product in products if product.price == price])
+        count = Counter(product.price for product in products)[price]
 
         # Retrieve all products with same availability
         prods = Product.find_by_price(price)
@@ -287,8 +290,7 @@ class TestProductModel(unittest.TestCase):
 
         # Create a batch of 10 products
         products = ProductFactory.create_batch(10)
-        for product in products:
-            product.create()
+        self._bulk_create(products)
         products = Product.all()
         self.assertEqual(len(products), 10)
 
@@ -14,9 +14,11 @@ import logging
 from decimal import Decimal
 from unittest import TestCase
 from urllib.parse import quote_plus
+from sqlalchemy import text
 from service import app
 from service.common import status
-from service.models import db, init_db, Product
+from service.models import db, init_db
+from service.routes import MAX_PAGE_SIZE
 from tests.factories import ProductFactory
 
 # Disable all but critical errors during normal test run
@@ -55,7 +57,7 @@ class TestProductRoutes(TestCase):
     def setUp(self):
         """Runs before each test"""
         self.client = app.test_client()
-        db.session.query(Product).delete()  # clean up the last tests
+        db.session.execute(text("TRUNCATE TABLE product RESTART IDENTITY CASCADE"))  # clean up the last tests
         db.session.commit()
 
     def tearDown(self):
@@ -173,6 +175,19 @@ class TestProductRoutes(TestCase):
         data = response.get_json()
         self.assertEqual(data["name"], test_product.name)
 
+    def test_get_product_not_modified(self):
+        """It should return 304 when the product ETag still matches"""
+        test_product = self._create_products()[0]
+        response = self.client.get(f"{BASE_URL}/{test_product.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response.headers.get("ETag")
+        self.assertIsNotNone(etag)
+        response = self.client.get(
+            f"{BASE_URL}/{test_product.id}", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(response.data), 0)
+
     def test_product_not_found(self):
         "It should not get a product thats not found"
         response = self.client.get(f"{BASE_URL}/0")
@@ -189,6 +204,30 @@ class TestProductRoutes(TestCase):
         data["description"] = "Unknown"
         response = self.client.put(f"{BASE_URL}/{data['id']}", json=data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updated_product = response.get_json()
+        self.assertEqual(updated_product["id"], data["id"])
+        self.assertEqual(updated_product["description"], "Unknown")
+
+    def test_update_product_not_found(self):
+        """It should not Update a Product that is not found"""
+        test_product = ProductFactory()
+        response = self.client.put(f"{BASE_URL}/0", json=test_product.serialize())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_product_not_found_bad_data(self):
+        """It should report a missing Product before an invalid body"""
+        test_product = ProductFactory().serialize()
+        del test_product["name"]
+        response = self.client.put(f"{BASE_URL}/0", json=test_product)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_product_bad_data(self):
+        """It should not Update a Product with an invalid body"""
+        test_product = self._create_products()[0]
+        new_product = test_product.serialize()
+        del new_product["name"]
+        response = self.client.put(f"{BASE_URL}/{test_product.id}", json=new_product)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_delete_product(self):
         """It should Delete a Product"""
@@ -212,6 +251,79 @@ class TestProductRoutes(TestCase):
         data = response.get_json()
         self.assertEqual(len(data), 5)
 
+    def test_get_product_list_paginated(self):
+        """It should Get a list of Products one page at a time"""
+        products = self._create_products(5)
+        response = self.client.get(BASE_URL, query_string="limit=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual(len(data), 3)
+        cursor = response.headers.get("X-Next-Cursor")
+        self.assertEqual(cursor, str(data[-1]["id"]))
+
+        # Follow the cursor to the last, partial page
+        response = self.client.get(BASE_URL, query_string=f"limit=3&cursor={cursor}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data += response.get_json()
+        self.assertIsNone(response.headers.get("X-Next-Cursor"))
+        self.assertEqual(
+            [product["id"] for product in data],
+            sorted(product.id for product in products),
+        )
+
+    def test_get_product_list_not_modified(self):
+        """It should return 304 when the product list ETag still matches"""
+        self._create_products(3)
+        response = self.client.get(BASE_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response.headers.get("ETag")
+        self.assertIsNotNone(etag)
+        response = self.client.get(BASE_URL, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(response.data), 0)
+
+        # A new product changes the list, so the old ETag no longer matches
+        self._create_products()
+        response = self.client.get(BASE_URL, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.get_json()), 4)
+
+    def test_get_product_list_page_not_modified(self):
+        """It should keep the next cursor on a 304 for a paginated list"""
+        self._create_products(5)
+        response = self.client.get(BASE_URL, query_string="limit=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response.headers.get("ETag")
+        cursor = response.headers.get("X-Next-Cursor")
+        self.assertIsNotNone(cursor)
+        response = self.client.get(
+            BASE_URL, query_string="limit=2", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.headers.get("X-Next-Cursor"), cursor)
+
+    def test_get_product_list_page_size_capped(self):
+        """It should not return more than MAX_PAGE_SIZE Products in a page"""
+        products = ProductFactory.create_batch(MAX_PAGE_SIZE + 1)
+        for product in products:
+            product.id = None
+        db.session.bulk_save_objects(products)
+        db.session.commit()
+
+        response = self.client.get(BASE_URL, query_string=f"limit={MAX_PAGE_SIZE * 2}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.get_json()
+        self.assertEqual(len(data), MAX_PAGE_SIZE)
+        self.assertEqual(response.headers.get("X-Next-Cursor"), str(data[-1]["id"]))
+
+    def test_get_product_list_bad_paging(self):
+        """It should not Get a list of Products with invalid paging parameters"""
+        for query_string in ("cursor=abc", "limit=ten", "limit=0", "limit=-5"):
+            response = self.client.get(BASE_URL, query_string=query_string)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, query_string
+            )
+
     def test_query_by_name(self):
         """It should Query Products by name"""
         products = self._create_products(5)
@@ -244,6 +356,11 @@ class TestProductRoutes(TestCase):
         for product in data:
             self.assertEqual(product["category"], category.name)
 
+    def test_query_by_invalid_category(self):
+        """It should not Query Products by an unknown category"""
+        response = self.client.get(BASE_URL, query_string="category=SPACESHIPS")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_query_by_availability(self):
         """It should Query Products by availability"""
         products = self._create_products(10)